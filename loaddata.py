@@ -1,23 +1,140 @@
+from pathlib import Path
+
 import xarray as xr
 import pandas as pd
 
 # Accès direct à ERA5 via Pangeo (sans téléchargement)
-url = 'gs://gcp-public-data-arco-era5/ar/full_37-1h-0p25deg-chunk-1.zarr-v3'
+URL = 'gs://gcp-public-data-arco-era5/ar/full_37-1h-0p25deg-chunk-1.zarr-v3'
+
+# Cache disque des chunks Zarr lus depuis GCS : au deuxième passage sur
+# les mêmes années, la lecture devient une lecture disque locale
+CACHE_ZARR = str(Path.home() / '.cache' / 'abeilles' / 'zarr')
+
+# Le store ARCO-ERA5 commence au 1940-01-01 : demander plus tôt (comme
+# l'ancienne borne 1900) force une recherche d'index hors plage pour rien
+PREMIERE_ANNEE_ERA5 = 1940
+
+
+def _ouvrir_era5():
+    """
+    Ouvre le store ARCO-ERA5 avec un découpage Dask aligné sur ses chunks.
+
+    Le store est découpé le long du temps : lire d'abord la taille native
+    des chunks pour aligner le découpage Dask dessus, au lieu de laisser
+    chunks='auto' choisir à l'aveugle.
+    """
+    url_cache = f'simplecache::{URL}'
+    options = {'simplecache': {'cache_storage': CACHE_ZARR}}
+
+    # consolidated=True : toutes les métadonnées en une seule requête
+    # objet-store, au lieu d'un aller-retour par variable du store
+    _meta = xr.open_zarr(url_cache, chunks=None, storage_options=options,
+                         consolidated=True)
+    _chunk_temps = _meta['2m_temperature'].encoding['chunks'][0]
+
+    ds = xr.open_zarr(
+        url_cache,
+        chunks={'time': _chunk_temps, 'latitude': -1, 'longitude': -1},
+        storage_options=options,
+        consolidated=True
+    )
+
+    # Ne garder que la variable utilisée : les 36 autres variables du
+    # store ne sont jamais lues, inutile de sérialiser leurs métadonnées
+    # dans chaque graphe de tâches Dask
+    return ds[['2m_temperature']]
+
+
+def charger_temperatures_era5(annees=range(2000, 2025),
+                              lat_slice=slice(43, 51),
+                              lon_slice=slice(-5, 9)):
+    """
+    Moyennes annuelles de température 2m ERA5 sur une zone (France par défaut).
+
+    À 0,25° horaire, une année pèse des dizaines de Go même après découpe
+    lat/lon : ne demander que les années réellement analysées. Pour
+    l'apiculture, les décennies récentes suffisent, d'où le défaut
+    2000-2024.
+
+    Paramètres:
+    -----------
+    annees : range ou list
+        Années à charger (>= PREMIERE_ANNEE_ERA5)
+    lat_slice, lon_slice : slice
+        Zone géographique (par défaut: France)
+
+    Retourne:
+    ---------
+    dict : {année: moyenne annuelle de température 2m (xarray)}
+    """
+    annees = [a for a in annees if a >= PREMIERE_ANNEE_ERA5]
+    ds = _ouvrir_era5()
+
+    # Boucle annuelle : chaque itération ne décode que les chunks
+    # temporels de l'année en cours
+    moyennes_annuelles = {}
+    for y in annees:
+        temp_annee = ds.sel(
+            time=slice(f'{y}', f'{y}'),
+            latitude=lat_slice,
+            longitude=lon_slice
+        )['2m_temperature']
+        moyennes_annuelles[y] = temp_annee.mean().compute()
+        print(y, float(moyennes_annuelles[y]))
+
+    return moyennes_annuelles
+
+
+def exporter_min_max_journaliers(annees=range(2000, 2025),
+                                 lat_slice=slice(43, 51),
+                                 lon_slice=slice(-5, 9),
+                                 chemin='era5_daily_france.zarr'):
+    """
+    Agrège l'horaire ERA5 en min/max journaliers et écrit un Zarr local.
+
+    Le calcul du GDD n'a besoin que des extrêmes journaliers : faire le
+    resample sur le graphe Dask, avant tout .compute(), laisse Dask
+    fusionner la réduction avec le décodage Zarr — 24 fois moins de
+    valeurs franchissent la frontière de sérialisation. Le Zarr local
+    produit se relit ensuite sans repasser par le cloud.
+
+    Paramètres:
+    -----------
+    annees : range ou list
+        Années à agréger (>= PREMIERE_ANNEE_ERA5)
+    lat_slice, lon_slice : slice
+        Zone géographique (par défaut: France)
+    chemin : str
+        Store Zarr de sortie
+
+    Retourne:
+    ---------
+    str : Chemin du store Zarr écrit
+    """
+    annees = [a for a in annees if a >= PREMIERE_ANNEE_ERA5]
+    ds = _ouvrir_era5()
+
+    for idx, y in enumerate(annees):
+        temp_annee = ds.sel(
+            time=slice(f'{y}', f'{y}'),
+            latitude=lat_slice,
+            longitude=lon_slice
+        )['2m_temperature']
 
-# Ouvrir le dataset (lecture directe cloud)
-ds = xr.open_zarr(url, chunks='auto')
+        # Réductions paresseuses : rien n'est matérialisé côté Python,
+        # to_zarr déclenche le calcul et écrit en continu
+        journalier = xr.Dataset({
+            't_min': temp_annee.resample(time='1D').min(),
+            't_max': temp_annee.resample(time='1D').max(),
+        })
 
-# Filtrer pour votre zone et période
-lat_slice = slice(43, 51)  # France
-lon_slice = slice(-5, 9)
+        if idx == 0:
+            journalier.to_zarr(chemin, mode='w')
+        else:
+            journalier.to_zarr(chemin, append_dim='time')
 
-ds_france = ds.sel(
-    latitude=lat_slice,
-    longitude=lon_slice,
-    time=slice('1900', '2025')
-)
+    return chemin
 
-# Extraire température 2m
-temp_data = ds_france['2m_temperature']
 
-print(temp_data)
\ No newline at end of file
+if __name__ == "__main__":
+    charger_temperatures_era5()
@@ -1,43 +1,304 @@
+import asyncio
+import concurrent.futures
+import datetime
+import functools
+import importlib.util
+from pathlib import Path
+
+import httpx
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba est optionnel : repli NumPy équivalent plus bas
+    njit = None
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur le décodeur standard
+    orjson = None
+
+API_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+# HTTP/2 repose sur le paquet h2 (extra httpx[http2]), optionnel comme
+# numba et orjson : on le détecte au lieu de l'exiger, httpx retombant
+# sinon sur HTTP/1.1 avec keep-alive
+_HTTP2 = importlib.util.find_spec('h2') is not None
+
+# Cache disque des séries annuelles (l'archive est immuable pour les
+# années révolues : inutile de retélécharger deux fois le même rucher)
+CACHE_DIR = Path.home() / '.cache' / 'abeilles' / 'openmeteo'
+
+# Jours sans mesure (l'archive est publiée avec ~5 jours de retard) :
+# sentinelle très froide, comptée pour zéro par le maximum contre t_base
+# sans décaler l'alignement jour-de-l'année de la série
+_DIXIEMES_MANQUANT = np.float32(-10000)
+
+# Session partagée avec pool de connexions : évite de repayer la poignée
+# de main TCP+TLS à chaque appel quand on interroge l'API pour de
+# nombreux ruchers
+session = requests.Session()
+session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
+def _decoder_json(response):
+    """
+    Décode une réponse JSON de l'API.
+
+    orjson décode les grands tableaux de flottants plusieurs fois plus
+    vite que le module json standard derrière response.json() — sensible
+    avec 365 valeurs par variable et par localisation, surtout sur les
+    réponses multi-localisations de get_gdd_batch.
+    """
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+def _en_dixiemes(t_mean):
+    """
+    Convertit une série de températures (°C) en dixièmes de degré int16.
+
+    Les jours manquants (None côté JSON, NaN côté NumPy) sont remplacés
+    par _DIXIEMES_MANQUANT avant la conversion entière : caster un NaN
+    en int16 émet un RuntimeWarning et produit une valeur dépendant de
+    la plateforme.
+    """
+    dixiemes = np.round(np.asarray(t_mean, dtype=np.float32) * 10)
+    return np.where(np.isnan(dixiemes),
+                    _DIXIEMES_MANQUANT, dixiemes).astype(np.int16)
+
+def _gdd_depuis_dixiemes(t_mean_dixiemes, t_base):
+    """
+    Somme des degrés-jours au-dessus de t_base sur une série en dixièmes.
+
+    L'API renvoie des températures au dixième de degré près : les stocker
+    en int16 (dixièmes) plutôt qu'en float64 divise la taille par quatre,
+    et le maximum entier est sans branchement — deux fois plus d'éléments
+    par registre SIMD, sans copie masquée comme avec clip.
+    """
+    base_dixiemes = np.int16(round(t_base * 10))
+    gdd_dixiemes = np.maximum(t_mean_dixiemes - base_dixiemes, np.int16(0))
+    return gdd_dixiemes.sum(dtype=np.int64) / 10.0
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def gdd_all(t_mean_dixiemes, base_dixiemes):
+        """
+        GDD cumulé par localisation sur un bloc (n_localisations, n_jours).
+
+        Boucle fusionnée compilée : une seule passe sur le bloc, aucun
+        tableau intermédiaire, et les localisations se répartissent sur
+        les cœurs via prange.
+        """
+        n, d = t_mean_dixiemes.shape
+        out = np.empty(n, np.float32)
+        for i in prange(n):
+            s = 0
+            for j in range(d):
+                x = t_mean_dixiemes[i, j] - base_dixiemes
+                if x > 0:
+                    s += x
+            out[i] = s / 10.0
+        return out
+else:
+    def gdd_all(t_mean_dixiemes, base_dixiemes):
+        """Repli NumPy pur du noyau Numba (mêmes entrées et sorties)."""
+        gdd_dixiemes = np.maximum(
+            t_mean_dixiemes.astype(np.int64) - base_dixiemes, 0
+        )
+        return (gdd_dixiemes.sum(axis=1) / 10.0).astype(np.float32)
+
+def _telecharger_t_mean(lat, lon, start_date, end_date):
+    """
+    Télécharge la série des moyennes journalières pour une période,
+    en dixièmes de degré int16.
+
+    La moyenne est demandée directement à l'API (variable
+    'temperature_2m_mean'), ce qui divise par deux les octets transférés
+    et évite le calcul (t_max + t_min) / 2 côté Python. Si la moyenne
+    n'est pas disponible pour la période, on retombe sur min/max.
+    """
+    # Requête API : une seule colonne, la moyenne est calculée côté serveur
+    params = {
+        'latitude': lat,
+        'longitude': lon,
+        'start_date': start_date,
+        'end_date': end_date,
+        'daily': 'temperature_2m_mean',
+        'timezone': 'auto'
+    }
+
+    response = session.get(API_URL, params=params)
+    data = _decoder_json(response)
+
+    t_mean = data.get('daily', {}).get('temperature_2m_mean')
+    if t_mean is not None:
+        return _en_dixiemes(t_mean)
+
+    # Repli : certaines périodes n'exposent pas la moyenne journalière.
+    params['daily'] = 'temperature_2m_max,temperature_2m_min'
+    response = session.get(API_URL, params=params)
+    data = _decoder_json(response)
+
+    # Une seule expression NumPy suffit : construire un DataFrame
+    # (inférence de dtype, alignement d'index) coûte plus cher que le calcul
+    tmax = np.asarray(data['daily']['temperature_2m_max'], dtype=np.float32)
+    tmin = np.asarray(data['daily']['temperature_2m_min'], dtype=np.float32)
+    return _en_dixiemes((tmax + tmin) * np.float32(0.5))
+
+@functools.lru_cache(maxsize=256)
+def _t_mean_annee(lat, lon, year):
+    """
+    Série complète des moyennes journalières d'une année révolue.
+
+    L'année entière est téléchargée une seule fois, matérialisée en
+    Parquet (zstd) sous CACHE_DIR, puis relue localement aux appels
+    suivants ; lru_cache garde en plus le tableau en mémoire pour la
+    durée du processus.
+    """
+    chemin = CACHE_DIR / f"{lat}_{lon}_{year}.parquet"
+    if chemin.exists():
+        colonne = 't_mean_dixiemes'
+        return pq.read_table(chemin, columns=[colonne])[colonne].to_numpy()
+
+    t_mean = _telecharger_t_mean(lat, lon, f"{year}-01-01", f"{year}-12-31")
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.table({'t_mean_dixiemes': t_mean}), chemin,
+                   compression='zstd')
+    return t_mean
 
 def get_gdd_from_open_meteo(lat, lon, date, t_base=5):
     """
     Récupère les températures et calcule GDD cumulé depuis le 1er janvier
+
+    Pour une année révolue, la série annuelle est servie depuis le cache
+    disque : une seule requête réseau par (lat, lon, année), quelle que
+    soit la date demandée dans l'année.
+    """
+    # La date est déjà en ISO-8601 : l'année est une tranche de chaîne,
+    # pas besoin du parseur de dates de pandas pour une soustraction
+    year = int(date[:4])
+    if year < datetime.date.today().year:
+        # Coordonnées arrondies à ~100 m : les ruchers voisins partagent
+        # la même maille Open-Meteo et donc le même fichier de cache
+        t_mean = _t_mean_annee(round(lat, 3), round(lon, 3), year)
+        jour = (datetime.date.fromisoformat(date)
+                - datetime.date(year, 1, 1)).days + 1
+        t_mean = t_mean[:jour]
+    else:
+        # Année en cours : l'archive bouge encore, pas de mise en cache
+        t_mean = _telecharger_t_mean(lat, lon, f"{year}-01-01", date)
+
+    return _gdd_depuis_dixiemes(t_mean, t_base)
+
+def get_gdd_batch(points, t_base=5):
+    """
+    Calcule le GDD cumulé pour une liste de points (lat, lon, date).
+
+    Les points partageant la même date sont regroupés en une seule requête
+    multi-localisations (l'API accepte des listes de latitude/longitude
+    pour une même période), et les groupes restants sont émis en parallèle
+    sur la session partagée : N allers-retours séquentiels deviennent
+    ~N/concurrence en temps mur. Retourne un tableau NumPy de GDD aligné
+    sur l'ordre de `points`.
     """
-    # Extraire l'année
-    year = pd.to_datetime(date).year
-    start_date = f"{year}-01-01"
-    
-    # Requête API
-    url = "https://archive-api.open-meteo.com/v1/archive"
+    # Regrouper par date : même période => une seule requête multi-points
+    groupes = {}
+    for i, (lat, lon, date) in enumerate(points):
+        groupes.setdefault(date, []).append((i, lat, lon))
+
+    gdd = np.empty(len(points), dtype=np.float32)
+
+    def _requete_groupe(date, membres):
+        year = int(date[:4])
+        params = {
+            'latitude': ','.join(str(lat) for _, lat, _ in membres),
+            'longitude': ','.join(str(lon) for _, _, lon in membres),
+            'start_date': f"{year}-01-01",
+            'end_date': date,
+            'daily': 'temperature_2m_mean',
+            'timezone': 'auto'
+        }
+        response = session.get(API_URL, params=params)
+        data = _decoder_json(response)
+        # Une seule localisation -> dict, plusieurs -> liste de dicts
+        if isinstance(data, dict):
+            data = [data]
+        indices, series = [], []
+        for (i, lat, lon), localisation in zip(membres, data):
+            t_mean = localisation.get('daily', {}).get('temperature_2m_mean')
+            if t_mean is not None:
+                indices.append(i)
+                series.append(_en_dixiemes(t_mean))
+            else:
+                # Repli point par point si la moyenne manque
+                gdd[i] = get_gdd_from_open_meteo(lat, lon, date, t_base)
+        if indices:
+            # Même date => même nombre de jours : les séries forment un
+            # bloc 2-D traité d'un coup par le noyau
+            bloc = np.stack(series)
+            gdd[indices] = gdd_all(bloc, np.int16(round(t_base * 10)))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(lambda kv: _requete_groupe(*kv), groupes.items()))
+
+    return gdd
+
+async def _gdd_async(client, lat, lon, date, t_base):
+    """Calcule le GDD d'un point sur le client HTTP/2 partagé."""
+    year = int(date[:4])
     params = {
         'latitude': lat,
         'longitude': lon,
-        'start_date': start_date,
+        'start_date': f"{year}-01-01",
         'end_date': date,
-        'daily': 'temperature_2m_max,temperature_2m_min',
+        'daily': 'temperature_2m_mean',
         'timezone': 'auto'
     }
-    
-    response = requests.get(url, params=params)
-    data = response.json()
-    
-    # Calculer GDD
-    temps = pd.DataFrame({
-        'date': pd.to_datetime(data['daily']['time']),
-        't_max': data['daily']['temperature_2m_max'],
-        't_min': data['daily']['temperature_2m_min']
-    })
-    
-    temps['t_mean'] = (temps['t_max'] + temps['t_min']) / 2
-    temps['gdd_daily'] = (temps['t_mean'] - t_base).clip(lower=0)
-    gdd_cumul = temps['gdd_daily'].sum()
-    
-    return gdd_cumul
-
-# Exemple d'utilisation
-lat, lon = 48.8, 2.49
-date = "2023-02-01"
-gdd = get_gdd_from_open_meteo(lat, lon, date, t_base=5)
-print(f"GDD cumulé au {date} : {gdd:.1f}°C·jours")
\ No newline at end of file
+
+    response = await client.get(API_URL, params=params)
+    data = _decoder_json(response)
+
+    t_mean = data.get('daily', {}).get('temperature_2m_mean')
+    if t_mean is not None:
+        return _gdd_depuis_dixiemes(_en_dixiemes(t_mean), t_base)
+
+    # Repli min/max, comme dans _telecharger_t_mean
+    params['daily'] = 'temperature_2m_max,temperature_2m_min'
+    response = await client.get(API_URL, params=params)
+    data = _decoder_json(response)
+
+    tmax = np.asarray(data['daily']['temperature_2m_max'], dtype=np.float32)
+    tmin = np.asarray(data['daily']['temperature_2m_min'], dtype=np.float32)
+    t_mean = _en_dixiemes((tmax + tmin) * np.float32(0.5))
+    return _gdd_depuis_dixiemes(t_mean, t_base)
+
+async def gdd_many(points, t_base=5):
+    """
+    Variante asynchrone de get_gdd_batch sur un client HTTP/2.
+
+    Les requêtes sont multiplexées sur un petit nombre de connexions
+    HTTP/2 (si le paquet optionnel h2 est présent, sinon HTTP/1.1 avec
+    keep-alive) au lieu d'un aller-retour par appel : pour N ruchers, le
+    temps mur passe de N·(RTT + handshake) à environ RTT·N/concurrence,
+    sans dépendre du regroupement par date. Retourne un tableau NumPy
+    aligné sur `points`.
+    """
+    limites = httpx.Limits(max_connections=32)
+    async with httpx.AsyncClient(http2=_HTTP2, limits=limites) as client:
+        resultats = await asyncio.gather(
+            *[_gdd_async(client, lat, lon, date, t_base)
+              for lat, lon, date in points]
+        )
+
+    return np.asarray(resultats, dtype=np.float32)
+
+if __name__ == "__main__":
+    # Exemple d'utilisation
+    lat, lon = 48.8, 2.49
+    date = "2023-02-01"
+    gdd = get_gdd_from_open_meteo(lat, lon, date, t_base=5)
+    print(f"GDD cumulé au {date} : {gdd:.1f}°C·jours")
@@ -6,6 +6,58 @@ Source: https://www.data.gouv.fr/fr/datasets/parquet-donnees-climatologiques-de-
 Auteur du dataset Parquet: Maxime Pawlak (Mister Meteo)
 """
 
+import os
+import sys
+from pathlib import Path
+
+import fsspec
+import requests
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as pds
+import pyarrow.parquet as pq
+
+# Colonnes utiles pour l'analyse (les fichiers en comptent ~60)
+COLONNES_UTILES = ['NUM_POSTE', 'AAAAMMJJ', 'TN', 'TX', 'RR']
+
+_BASE_URL = "https://object.files.data.gouv.fr/meteofrance-mistermeteo/"
+
+# Cache disque des blocs Parquet lus à distance (les fichiers sources
+# sont en pratique immuables) : une relecture ne repasse pas par le réseau
+CACHE_PARQUET = Path.home() / '.cache' / 'abeilles' / 'parquet'
+
+# Utiliser tous les cœurs pour les scans Arrow : fichiers et row groups
+# sont lus en parallèle, ce qui sature le lien réseau au lieu d'attendre
+# chaque fichier l'un après l'autre
+pa.set_cpu_count(os.cpu_count() or 1)
+
+# Périodes publiées par la source et leurs bornes en années. Les noms de
+# fichiers étant figés côté source, périodes et URLs sont matérialisées
+# une fois à l'import : les appels ne font plus que filtrer ce tableau
+# Format: quotidien.{periode}.parquet ou quotidien.{periode}.prepared.parquet
+_PERIODES = {
+    "previous-1950": (0, 1949),
+    "1950-1959": (1950, 1959),
+    "1960-1969": (1960, 1969),
+    "1970-1979": (1970, 1979),
+    "1980-1989": (1980, 1989),
+    "1990-1999": (1990, 1999),
+    "2000-2009": (2000, 2009),
+    "2010-2019": (2010, 2019),
+    "2020-2021": (2020, 2021),
+    # Périodes récentes (mises à jour fréquemment)
+    "latest-2022-2023": (2022, 2023),
+    "latest-2023-2024": (2023, 2024),
+    "latest-2024-2025": (2024, 2025),
+}
+
+_URLS_PAR_PERIODE = {
+    periode: (f"{_BASE_URL}quotidien.{periode}.parquet",
+              f"{_BASE_URL}quotidien.{periode}.prepared.parquet")
+    for periode in _PERIODES
+}
+
+
 def generer_urls_parquet_quotidien(annee_debut=1990, annee_fin=2020):
     """
     Génère la liste des URLs de fichiers Parquet contenant les données quotidiennes
@@ -26,57 +78,208 @@ def generer_urls_parquet_quotidien(annee_debut=1990, annee_fin=2020):
     list : Liste des URLs de fichiers Parquet à télécharger
     """
     
-    base_url = "https://object.files.data.gouv.fr/meteofrance-mistermeteo/"
-    
-    # Structure des fichiers Parquet selon la documentation
-    # Format: quotidien.{periode}.parquet ou quotidien.{periode}.prepared.parquet
-    
-    # Définition des périodes disponibles basée sur la structure typique
-    # Ces périodes sont généralement regroupées par tranches
-    periodes = []
-    
-    # Périodes historiques (regroupées par décennies ou plus)
-    if annee_debut <= 1949:
-        periodes.append("previous-1950")
-    
-    if annee_debut <= 1989 and annee_fin >= 1950:
-        periodes.append("1950-1959")
-        periodes.append("1960-1969")
-        periodes.append("1970-1979")
-        periodes.append("1980-1989")
-    
-    if annee_debut <= 2021 and annee_fin >= 1990:
-        periodes.append("1990-1999")
-        periodes.append("2000-2009")
-        periodes.append("2010-2019")
-        periodes.append("2020-2021")
-    
-    # Période récente (mise à jour fréquemment)
-    if annee_fin >= 2022:
-        periodes.append("latest-2022-2023")
-        periodes.append("latest-2023-2024")
-        periodes.append("latest-2024-2025")
-    
-    # Générer les URLs
+    # Simple filtre par chevauchement sur le tableau pré-calculé :
+    # plus aucun formatage de chaîne au moment de l'appel
     urls = []
     urls_prepared = []
     
-    for periode in periodes:
-        # URL du fichier brut
-        url_brut = f"{base_url}quotidien.{periode}.parquet"
-        urls.append(url_brut)
-        
-        # URL du fichier préparé (.prepared)
-        url_prepared = f"{base_url}quotidien.{periode}.prepared.parquet"
-        urls_prepared.append(url_prepared)
+    for periode, (annee_min, annee_max) in _PERIODES.items():
+        if annee_min <= annee_fin and annee_max >= annee_debut:
+            url_brut, url_prepared = _URLS_PAR_PERIODE[periode]
+            urls.append(url_brut)
+            urls_prepared.append(url_prepared)
     
     return urls, urls_prepared
 
 
+def _systeme_fichiers_https():
+    """
+    Système de fichiers https avec cache disque par blocs.
+
+    blockcache ne télécharge et ne conserve que les octets réellement
+    lus (empreintes de fichiers, row groups retenus par le filtre), là
+    où un cache par fichier entier annulerait l'élagage des row groups.
+    """
+    return fsspec.filesystem('blockcache', target_protocol='https',
+                             cache_storage=str(CACHE_PARQUET))
+
+
+def _bornes_departement(dept):
+    """
+    Bornes entières [basse, haute) des NUM_POSTE d'un département.
+
+    Les NUM_POSTE sont des codes station à 8 chiffres préfixés par le
+    département : dept 67 => [67000000, 68000000).
+    """
+    borne_basse = int(dept) * 1_000_000
+    return borne_basse, borne_basse + 1_000_000
+
+
+def _filtre_departement(dept):
+    """
+    Prédicat Arrow délimitant un département par bornes entières.
+
+    Une comparaison d'entiers est exploitable par les statistiques
+    min/max des row groups (élagage sans décompression), là où
+    starts_with force la matérialisation de chaque chaîne et un
+    parcours UTF-8 par ligne.
+    """
+    borne_basse, borne_haute = _bornes_departement(dept)
+    poste = pc.field('NUM_POSTE').cast(pa.int32())
+    return (poste >= borne_basse) & (poste < borne_haute)
+
+
+def charger_departement(urls, dept='67', colonnes=None,
+                        date_debut=19900101, date_fin=20201231):
+    """
+    Charge les données d'un département depuis les fichiers Parquet distants.
+
+    Le filtre (département + période) et la projection de colonnes sont
+    poussés dans le lecteur Parquet : les row groups dont les statistiques
+    excluent le département sont sautés sans être téléchargés, et seules
+    les colonnes demandées sont décompressées (≈1% des lignes et 5
+    colonnes sur ~60 pour un département), au lieu de tout télécharger
+    puis filtrer en pandas.
+
+    Paramètres:
+    -----------
+    urls : list
+        URLs des fichiers Parquet (de préférence les fichiers '.prepared')
+    dept : str
+        Numéro de département (par défaut: '67')
+    colonnes : list
+        Colonnes à charger (par défaut: COLONNES_UTILES)
+    date_debut : int
+        Date de début au format AAAAMMJJ (par défaut: 19900101)
+    date_fin : int
+        Date de fin au format AAAAMMJJ (par défaut: 20201231)
+
+    Retourne:
+    ---------
+    pyarrow.Table : Données filtrées du département
+    """
+    dset = pds.dataset(urls, format='parquet',
+                       filesystem=_systeme_fichiers_https())
+
+    filtre = (
+        _filtre_departement(dept)
+        & (pc.field('AAAAMMJJ') >= date_debut)
+        & (pc.field('AAAAMMJJ') <= date_fin)
+    )
+
+    return dset.to_table(columns=colonnes or COLONNES_UTILES, filter=filtre,
+                         use_threads=True)
+
+
+def lire_parquet_en_flux(url, dept='67', colonnes=None, batch_size=100_000):
+    """
+    Lit un fichier Parquet distant par lots, sans téléchargement complet.
+
+    Le fichier est ouvert paresseusement via fsspec (requêtes par plages
+    d'octets) et parcouru row group par row group avec iter_batches :
+    une seule passe, mémoire bornée à batch_size lignes, aucun fichier
+    local intermédiaire. Le filtre département est appliqué à chaque lot
+    avant accumulation, si bien que seules les lignes retenues restent
+    en mémoire.
+
+    Paramètres:
+    -----------
+    url : str
+        URL d'un fichier Parquet
+    dept : str
+        Numéro de département (par défaut: '67')
+    colonnes : list
+        Colonnes à lire (par défaut: COLONNES_UTILES)
+    batch_size : int
+        Nombre maximal de lignes par lot (par défaut: 100 000)
+
+    Retourne:
+    ---------
+    pyarrow.Table : Lignes du département présentes dans le fichier
+    """
+    borne_basse, borne_haute = _bornes_departement(dept)
+
+    lots = []
+    with _systeme_fichiers_https().open(url, 'rb') as fichier:
+        pf = pq.ParquetFile(fichier)
+        for lot in pf.iter_batches(batch_size=batch_size,
+                                   columns=colonnes or COLONNES_UTILES):
+            poste = pc.cast(lot.column('NUM_POSTE'), pa.int32())
+            masque = pc.and_(pc.greater_equal(poste, borne_basse),
+                             pc.less(poste, borne_haute))
+            lots.append(lot.filter(masque))
+
+    return pa.Table.from_batches(lots)
+
+
+def telecharger_en_memoire(url, dept='67', colonnes=None):
+    """
+    Télécharge un fichier Parquet entier et le lit sans passer par le disque.
+
+    À réserver aux cas où les requêtes par plages d'octets ne passent pas
+    (proxy, miroir local...) : les octets reçus alimentent directement
+    Arrow via un BufferReader — pas d'écriture disque puis relecture, ni
+    de deuxième copie en mémoire — et le filtre département reste poussé
+    dans le lecteur, qui saute les row groups exclus par leurs
+    statistiques de pied de fichier.
+
+    Paramètres:
+    -----------
+    url : str
+        URL d'un fichier Parquet
+    dept : str
+        Numéro de département (par défaut: '67')
+    colonnes : list
+        Colonnes à lire (par défaut: COLONNES_UTILES)
+
+    Retourne:
+    ---------
+    pyarrow.Table : Lignes du département présentes dans le fichier
+    """
+    reponse = requests.get(url, stream=True)
+    tampon = pa.BufferReader(reponse.raw.read())
+
+    return pq.read_table(tampon, columns=colonnes or COLONNES_UTILES,
+                         filters=_filtre_departement(dept))
+
+
+def combiner_et_sauvegarder(tables, chemin='meteo_dep67_1990_2020.parquet'):
+    """
+    Combine des tables Arrow d'un département et les sauvegarde triées.
+
+    La concaténation Arrow est zéro-copie, là où pd.concat recopiait
+    chaque DataFrame une fois par fichier puis une fois globalement. Le
+    tri par date passe par pyarrow.compute.sort_indices et l'écriture se
+    fait en Parquet compressé zstd. Ne convertir en pandas qu'en bout de
+    chaîne, si un consommateur l'exige.
+
+    Paramètres:
+    -----------
+    tables : list
+        Tables pyarrow à combiner (ex: une par fichier source)
+    chemin : str
+        Fichier Parquet de sortie
+
+    Retourne:
+    ---------
+    pyarrow.Table : Table combinée, triée par AAAAMMJJ
+    """
+    table = pa.concat_tables(tables, promote_options='default')
+    table = table.take(
+        pc.sort_indices(table, sort_keys=[('AAAAMMJJ', 'ascending')])
+    )
+    pq.write_table(table, chemin, compression='zstd')
+    return table
+
+
 def afficher_urls(annee_debut=1990, annee_fin=2020, format_sortie="texte"):
     """
     Affiche les URLs des fichiers Parquet nécessaires.
-    
+
+    Toute la sortie est assemblée en mémoire puis émise en une seule
+    écriture : pas un appel système (et une prise du verrou stdout) par
+    ligne, et l'affichage reste atomique sous utilisation concurrente.
+
     Paramètres:
     -----------
     annee_debut : int
@@ -89,30 +292,23 @@ def afficher_urls(annee_debut=1990, annee_fin=2020, format_sortie="texte"):
     
     urls_brut, urls_prepared = generer_urls_parquet_quotidien(annee_debut, annee_fin)
     
-    print("=" * 80)
-    print(f"URLs des fichiers Parquet pour les données quotidiennes {annee_debut}-{annee_fin}")
-    print("=" * 80)
-    print()
-    
-    print("IMPORTANT:")
-    print("- Ces fichiers contiennent les données pour TOUS les départements")
-    print("- Vous devrez filtrer les données pour le département 67 après téléchargement")
-    print("- Les fichiers '.prepared' sont recommandés (colonnes nettoyées et typées)")
-    print()
+    sortie = [
+        "=" * 80,
+        f"URLs des fichiers Parquet pour les données quotidiennes {annee_debut}-{annee_fin}",
+        "=" * 80,
+        "",
+        "IMPORTANT:",
+        "- Ces fichiers contiennent les données pour TOUS les départements",
+        "- Vous devrez filtrer les données pour le département 67 après téléchargement",
+        "- Les fichiers '.prepared' sont recommandés (colonnes nettoyées et typées)",
+        "",
+    ]
     
     if format_sortie == "texte":
-        print("-" * 80)
-        print("FICHIERS PRÉPARÉS (recommandés):")
-        print("-" * 80)
-        for i, url in enumerate(urls_prepared, 1):
-            print(f"{i}. {url}")
-        
-        print()
-        print("-" * 80)
-        print("FICHIERS BRUTS (alternatifs):")
-        print("-" * 80)
-        for i, url in enumerate(urls_brut, 1):
-            print(f"{i}. {url}")
+        sortie += ["-" * 80, "FICHIERS PRÉPARÉS (recommandés):", "-" * 80]
+        sortie += [f"{i}. {url}" for i, url in enumerate(urls_prepared, 1)]
+        sortie += ["", "-" * 80, "FICHIERS BRUTS (alternatifs):", "-" * 80]
+        sortie += [f"{i}. {url}" for i, url in enumerate(urls_brut, 1)]
     
     elif format_sortie == "json":
         import json
@@ -122,82 +318,47 @@ def afficher_urls(annee_debut=1990, annee_fin=2020, format_sortie="texte"):
             "fichiers_bruts": urls_brut,
             "note": "Filtrer par département 67 après téléchargement"
         }
-        print(json.dumps(data, indent=2, ensure_ascii=False))
+        sortie.append(json.dumps(data, indent=2, ensure_ascii=False))
     
     elif format_sortie == "python":
-        print("# Liste des URLs (fichiers préparés)")
-        print("urls_prepared = [")
-        for url in urls_prepared:
-            print(f'    "{url}",')
-        print("]")
-        print()
-        print("# Liste des URLs (fichiers bruts)")
-        print("urls_brut = [")
-        for url in urls_brut:
-            print(f'    "{url}",')
-        print("]")
-    
-    print()
-    print("=" * 80)
-    print("COMMENT UTILISER CES FICHIERS:")
-    print("=" * 80)
-    print("""
-1. Télécharger les fichiers Parquet:
-   
-   import requests
-   for url in urls_prepared:
-       nom_fichier = url.split('/')[-1]
-       response = requests.get(url)
-       with open(nom_fichier, 'wb') as f:
-           f.write(response.content)
-
-2. Lire et filtrer les données (requiert: pip install pandas pyarrow):
-   
-   import pandas as pd
-   
-   # Lire un fichier Parquet
-   df = pd.read_parquet('quotidien.1990-1999.prepared.parquet')
-   
-   # Filtrer pour le département 67
-   # (La colonne exacte peut varier: 'NUM_POSTE', 'DEPT', etc.)
-   df_67 = df[df['NUM_POSTE'].str.startswith('67')]
-   
-   # Ou si la colonne département existe:
-   # df_67 = df[df['DEPT'] == '67']
-   
-   # Filtrer par période (1990-2020)
-   df_67 = df_67[(df_67['AAAAMMJJ'] >= 19900101) & (df_67['AAAAMMJJ'] <= 20201231)]
-   
-3. Combiner plusieurs fichiers:
-   
-   import pandas as pd
-   import glob
-   
-   # Lire tous les fichiers Parquet
-   fichiers = glob.glob('quotidien.*.prepared.parquet')
-   
-   dfs = []
-   for fichier in fichiers:
-       df = pd.read_parquet(fichier)
-       # Filtrer pour le département 67
-       df_67 = df[df['NUM_POSTE'].str.startswith('67')]
-       dfs.append(df_67)
-   
-   # Combiner tous les DataFrames
-   df_final = pd.concat(dfs, ignore_index=True)
-   
-   # Trier par date
-   df_final = df_final.sort_values('AAAAMMJJ')
-   
-   # Sauvegarder
-   df_final.to_parquet('meteo_dep67_1990_2020.parquet')
-   df_final.to_csv('meteo_dep67_1990_2020.csv', index=False)
-""")
+        sortie += ["# Liste des URLs (fichiers préparés)", "urls_prepared = ["]
+        sortie += [f'    "{url}",' for url in urls_prepared]
+        sortie += ["]", "", "# Liste des URLs (fichiers bruts)", "urls_brut = ["]
+        sortie += [f'    "{url}",' for url in urls_brut]
+        sortie.append("]")
     
-    print("=" * 80)
-    print("INFORMATIONS SUPPLÉMENTAIRES:")
-    print("=" * 80)
-    print(f"""
+    sortie += [
+        "",
+        "=" * 80,
+        "COMMENT UTILISER CES FICHIERS:",
+        "=" * 80,
+        """
+1. Charger directement le département 67 (requiert: pip install pyarrow fsspec aiohttp):
+
+   from loaddata3 import generer_urls_parquet_quotidien, charger_departement
+
+   urls, urls_prepared = generer_urls_parquet_quotidien(1990, 2020)
+   table = charger_departement(urls_prepared, dept='67')
+
+   # Le filtre et la projection sont poussés dans le lecteur Parquet :
+   # seules les lignes du département et les colonnes utiles sont
+   # téléchargées (pas de téléchargement complet préalable)
+
+2. Passer en pandas si besoin:
+
+   df_67 = table.to_pandas()
+
+3. Combiner plusieurs fichiers et sauvegarder:
+
+   from loaddata3 import lire_parquet_en_flux, combiner_et_sauvegarder
+
+   tables = [lire_parquet_en_flux(url) for url in urls_prepared]
+   table = combiner_et_sauvegarder(tables, 'meteo_dep67_1990_2020.parquet')
+""",
+        "=" * 80,
+        "INFORMATIONS SUPPLÉMENTAIRES:",
+        "=" * 80,
+        f"""
 - Source: data.gouv.fr (Maxime Pawlak - Mister Meteo)
 - Dataset: https://www.data.gouv.fr/fr/datasets/parquet-donnees-climatologiques-de-base-mensuelles-quotidiennes-horaires-6-minutes-format-parquet/
 - Licence: Licence Ouverte 2.0
@@ -205,7 +366,10 @@ def afficher_urls(annee_debut=1990, annee_fin=2020, format_sortie="texte"):
 - Contenu: Toutes les stations de tous les départements
 - Mise à jour: Hebdomadaire pour les données récentes
 - Contact dataset: contact@mistermeteo.com
-""")
+""",
+    ]
+    
+    sys.stdout.write("\n".join(sortie) + "\n")
 
 
 def sauvegarder_urls_fichier(annee_debut=1990, annee_fin=2020, nom_fichier="urls_parquet.txt"):
@@ -231,8 +395,6 @@ def sauvegarder_urls_fichier(annee_debut=1990, annee_fin=2020, nom_fichier="urls
 
 
 if __name__ == "__main__":
-    import sys
-    
     # Paramètres par défaut
     annee_debut = 1950
     annee_fin = 2020